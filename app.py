@@ -9,8 +9,10 @@ from langchain_core.messages import AIMessage
 
 from src.rag_pipeline import build_rag_chain
 from src.rag_pipeline import vectorstore_exists
+from src.rag_pipeline import cache_stats
 from src.loaders import load_files, load_urls
-from src.rag_pipeline import build_vectorstore
+from src.rag_pipeline import build_index_version
+from src.index_store import resolve_index_dir
 from src.utils import get_config
 from src.knowledge import quick_answer
 
@@ -94,6 +96,14 @@ with st.sidebar:
     st.markdown("This assistant cites sources; always verify time-sensitive policies.")
     st.markdown("---")
     show_src = st.toggle("Show sources", value=False, help="Include 1–3 official links when available")
+    with st.expander("Retrieval cache stats"):
+        stats = cache_stats()
+        if not stats:
+            st.caption("No retrieval yet.")
+        for name in ("embeddings", "results", "contextualize"):
+            if name in stats:
+                c = stats[name]
+                st.caption(f"{name}: {c['hit_rate']:.0%} hit rate ({c['hits']}/{c['hits'] + c['misses']}), {c['size']}/{c['maxsize']} entries")
 
 st.markdown("---")
 
@@ -157,7 +167,7 @@ if not st.session_state['rag_built']:
     except Exception as e:
         # Friendly recovery UI
         cfg = get_config()
-        idx_ok = vectorstore_exists(cfg['VECTOR_DIR'])
+        idx_ok = vectorstore_exists(resolve_index_dir(cfg['VECTOR_DIR']))
         st.error(
             "Could not initialize RAG chain. If this is your first run, please build the index.")
         with st.expander("Build index now (quick setup)", expanded=not idx_ok):
@@ -177,12 +187,14 @@ if not st.session_state['rag_built']:
                         st.warning("No documents found. Add PDFs/MDs to data/ or provide URLs.")
                     else:
                         try:
-                            build_vectorstore(
+                            build_index_version(
                                 docs,
                                 vector_dir=cfg['VECTOR_DIR'],
                                 embed_model=cfg['EMBED_MODEL'],
                                 chunk_size=cfg['CHUNK_SIZE'],
                                 chunk_overlap=cfg['CHUNK_OVERLAP'],
+                                max_shrink=cfg['INDEX_MAX_SHRINK'],
+                                keep=cfg['INDEX_KEEP_VERSIONS'],
                             )
                             st.success("Index built! Reloading chain…")
                             # Re-init chain
@@ -239,10 +251,12 @@ if user_q and st.session_state.get('chain'):
                 f"{m['role']}: {m['content']}" for m in st.session_state.messages[-8:]
             )
             docs = retriever.invoke({"input": user_q, "chat_history": chat_history_text})[:5]
+            # Reuse the same docs so the answer and its sources share one index snapshot
             ai_msg: AIMessage = st.session_state['chain'].invoke({
                 "question": user_q,
                 "chat_history": chat_history_text,
                 "profile": st.session_state.profile,
+                "docs": docs,
             })
             # Friendly prefix occasionally (do not repeat the question every time)
             prefix = friendly_prefix(user_q)
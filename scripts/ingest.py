@@ -1,38 +1,69 @@
 from __future__ import annotations
 
 import argparse
+import time
 from pathlib import Path
 from typing import List
 
 from src.loaders import load_files, load_urls
-from src.rag_pipeline import build_vectorstore
+from src.index_store import parse_smoke_check
+from src.rag_pipeline import build_index_version
 from src.utils import get_config
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Ingest files/urls into FAISS vector store")
-    parser.add_argument("--paths", nargs="*", default=["data"], help="Files or folders to ingest")
-    parser.add_argument("--urls", nargs="*", default=[], help="Web URLs to crawl (single hop)")
-    args = parser.parse_args()
-
-    cfg = get_config()
-
+def run_once(args, cfg) -> bool:
     file_docs = load_files(args.paths)
     url_docs = load_urls(args.urls)
     docs = file_docs + url_docs
 
     if not docs:
         print("No documents found. Add PDFs/MDs in data/ or pass --urls.")
-        return
+        return False
 
-    build_vectorstore(
+    version = build_index_version(
         docs,
         vector_dir=cfg['VECTOR_DIR'],
         embed_model=cfg['EMBED_MODEL'],
         chunk_size=cfg['CHUNK_SIZE'],
         chunk_overlap=cfg['CHUNK_OVERLAP'],
+        min_docs=args.min_docs,
+        smoke_checks=args.smoke_query,
+        max_shrink=args.max_shrink if args.max_shrink is not None else cfg['INDEX_MAX_SHRINK'],
+        keep=cfg['INDEX_KEEP_VERSIONS'],
     )
-    print(f"Indexed {len(docs)} documents into {cfg['VECTOR_DIR']}")
+    print(f"Indexed {len(docs)} documents into {cfg['VECTOR_DIR']} (version {version})")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest files/urls into FAISS vector store")
+    parser.add_argument("--paths", nargs="*", default=["data"], help="Files or folders to ingest")
+    parser.add_argument("--urls", nargs="*", default=[], help="Web URLs to crawl (single hop)")
+    parser.add_argument("--min-docs", type=int, default=1,
+                        help="Minimum number of loaded documents for a new index to be published")
+    parser.add_argument("--max-shrink", type=float, default=None,
+                        help="Reject a build with this fraction fewer chunks than the live one "
+                             "(default: INDEX_MAX_SHRINK or 0.5)")
+    parser.add_argument("--smoke-query", action="append", default=[], type=parse_smoke_check,
+                        metavar="QUERY=>EXPECTED",
+                        help="Query whose top results must contain EXPECTED text (repeatable)")
+    parser.add_argument("--every", type=float, default=0,
+                        help="Re-crawl and rebuild every N minutes (0 = run once)")
+    args = parser.parse_args()
+
+    cfg = get_config()
+
+    if args.every <= 0:
+        run_once(args, cfg)
+        return
+
+    while True:
+        try:
+            run_once(args, cfg)
+        except Exception as e:
+            # Keep the live index and try again on the next cycle.
+            print(f"Refresh failed: {e}")
+        time.sleep(args.every * 60)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .utils import ensure_dir
+
+# Layout under VECTOR_DIR:
+#   versions/<version>/index.faiss, index.pkl   one directory per build
+#   versions/<version>/manifest.json            doc/chunk counts for that build
+#   CURRENT                                      name of the live version
+# A VECTOR_DIR holding index files directly (no CURRENT) is still supported.
+VERSIONS_DIRNAME = "versions"
+POINTER_NAME = "CURRENT"
+MANIFEST_NAME = "manifest.json"
+
+
+class IndexValidationError(RuntimeError):
+    """Raised when a freshly built index fails its sanity checks."""
+
+
+def new_version_name() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+def versions_dir(vector_dir: str | Path) -> Path:
+    return Path(vector_dir) / VERSIONS_DIRNAME
+
+
+def version_dir(vector_dir: str | Path, version: str) -> Path:
+    return versions_dir(vector_dir) / version
+
+
+def current_version(vector_dir: str | Path) -> Optional[str]:
+    """Return the version named by the CURRENT pointer, or None if there is none."""
+    pointer = Path(vector_dir) / POINTER_NAME
+    try:
+        version = pointer.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    if version and version_dir(vector_dir, version).is_dir():
+        return version
+    return None
+
+
+def write_manifest(index_dir: str | Path, doc_count: int, chunk_count: int) -> None:
+    data = {"doc_count": doc_count, "chunk_count": chunk_count}
+    (Path(index_dir) / MANIFEST_NAME).write_text(json.dumps(data), encoding="utf-8")
+
+
+def read_manifest(index_dir: str | Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads((Path(index_dir) / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def live_chunk_count(vector_dir: str | Path) -> Optional[int]:
+    """Chunk count of the published version, or None if unknown (e.g. legacy layout)."""
+    version = current_version(vector_dir)
+    if not version:
+        return None
+    manifest = read_manifest(version_dir(vector_dir, version)) or {}
+    count = manifest.get("chunk_count")
+    return int(count) if count is not None else None
+
+
+def parse_smoke_check(spec: str) -> Tuple[str, str]:
+    """Split a ``"query=>expected text"`` smoke check into (query, expected)."""
+    query, sep, expected = spec.partition("=>")
+    if not sep or not query.strip() or not expected.strip():
+        raise ValueError(f"Smoke check must look like 'query=>expected text': {spec!r}")
+    return query.strip(), expected.strip()
+
+
+def resolve_index_dir(vector_dir: str | Path) -> Path:
+    """Directory holding the live FAISS files (versioned if published, else legacy)."""
+    version = current_version(vector_dir)
+    if version:
+        return version_dir(vector_dir, version)
+    return Path(vector_dir)
+
+
+def publish_version(vector_dir: str | Path, version: str) -> None:
+    """Atomically point CURRENT at ``version``; readers see either the old or new name."""
+    if not version_dir(vector_dir, version).is_dir():
+        raise FileNotFoundError(f"Index version not found: {version}")
+    root = ensure_dir(vector_dir)
+    fd, tmp = tempfile.mkstemp(dir=root, prefix=f".{POINTER_NAME}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, root / POINTER_NAME)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def list_versions(vector_dir: str | Path) -> List[str]:
+    d = versions_dir(vector_dir)
+    if not d.is_dir():
+        return []
+    return sorted(p.name for p in d.iterdir() if p.is_dir())
+
+
+def prune_versions(vector_dir: str | Path, keep: int = 3) -> List[str]:
+    """Delete all but the newest ``keep`` versions up to and including the live one.
+
+    Versions newer than the live one may be builds still in progress elsewhere, so
+    they are never touched.
+    """
+    live = current_version(vector_dir)
+    if not live:
+        return []
+    old = [v for v in list_versions(vector_dir) if v < live]
+    removed = old[:max(0, len(old) - max(0, keep - 1))]
+    for v in removed:
+        shutil.rmtree(version_dir(vector_dir, v), ignore_errors=True)
+    return removed
+
+
+def validate_index(vs, doc_count: int, min_docs: int = 1,
+                   smoke_checks: Iterable[Tuple[str, str]] = (), k: int = 5,
+                   live_chunks: Optional[int] = None, max_shrink: float = 0.5) -> None:
+    """Sanity-check a new index before it is published.
+
+    - at least ``min_docs`` source documents were loaded;
+    - the chunk count did not drop more than ``max_shrink`` below ``live_chunks``;
+    - for each (query, expected) smoke check, ``expected`` appears (case-insensitive)
+      in the content or source of the top-``k`` results.
+    """
+    if doc_count < min_docs:
+        raise IndexValidationError(f"Loaded {doc_count} documents; expected at least {min_docs}")
+    chunks = len(vs.index_to_docstore_id)
+    if live_chunks and chunks < live_chunks * (1 - max_shrink):
+        raise IndexValidationError(
+            f"Index has {chunks} chunks, down from {live_chunks} in the live version"
+            f" (more than {max_shrink:.0%} smaller)")
+    for query, expected in smoke_checks:
+        docs = vs.similarity_search(query, k=k)
+        haystack = "\n".join(
+            f"{d.page_content}\n{(d.metadata or {}).get('source', '')}" for d in docs
+        ).lower()
+        if expected.lower() not in haystack:
+            raise IndexValidationError(
+                f"Smoke query {query!r} did not return {expected!r} in the top {k} results")
@@ -1,23 +1,38 @@
 from __future__ import annotations
 
+import hashlib
+import logging
+import shutil
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_groq import ChatGroq
 from langchain_core.documents import Document
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnableParallel, RunnablePassthrough, RunnableLambda
-from langchain.chains.history_aware_retriever import (
-    create_history_aware_retriever,
-)
-from langchain_core.prompts import MessagesPlaceholder
 
 from .utils import ensure_dir, get_config
+from .index_store import (
+    current_version,
+    live_chunk_count,
+    new_version_name,
+    prune_versions,
+    publish_version,
+    validate_index,
+    version_dir,
+    write_manifest,
+)
 from .prompts import RAG_PROMPT, CONTEXTUALIZE_QUESTION_PROMPT
 
+logger = logging.getLogger(__name__)
+
 
 def build_vectorstore(docs: List[Document], vector_dir: str, embed_model: str,
                       chunk_size: int = 900, chunk_overlap: int = 120) -> FAISS:
@@ -32,20 +47,291 @@ def build_vectorstore(docs: List[Document], vector_dir: str, embed_model: str,
     return vs
 
 
-def load_vectorstore(vector_dir: str, embed_model: str) -> FAISS:
-    embeddings = HuggingFaceEmbeddings(model_name=embed_model)
+def load_vectorstore(vector_dir: str, embed_model: str, embeddings=None) -> FAISS:
+    if embeddings is None:
+        embeddings = HuggingFaceEmbeddings(model_name=embed_model)
     return FAISS.load_local(vector_dir, embeddings, allow_dangerous_deserialization=True)
 
 
+def build_index_version(docs: List[Document], vector_dir: str, embed_model: str,
+                        chunk_size: int = 900, chunk_overlap: int = 120,
+                        min_docs: int = 1, smoke_checks: Iterable[Tuple[str, str]] = (),
+                        max_shrink: float = 0.5, keep: int = 3) -> str:
+    """Build into a fresh ``versions/<version>`` directory, validate it, then flip CURRENT.
+
+    The live index is untouched until validation passes (see ``validate_index``); a
+    build that fails validation or publishing is removed and the error re-raised.
+    Returns the published version name.
+    """
+    version = new_version_name()
+    target = version_dir(vector_dir, version)
+    try:
+        vs = build_vectorstore(docs, str(target), embed_model,
+                               chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        validate_index(vs, doc_count=len(docs), min_docs=min_docs, smoke_checks=smoke_checks,
+                       live_chunks=live_chunk_count(vector_dir), max_shrink=max_shrink)
+        write_manifest(target, doc_count=len(docs), chunk_count=len(vs.index_to_docstore_id))
+        publish_version(vector_dir, version)
+    except Exception:
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+    prune_versions(vector_dir, keep=keep)
+    return version
+
+
 def vectorstore_exists(vector_dir: str | Path) -> bool:
     """Return True if FAISS index files exist in the given directory."""
     p = Path(vector_dir)
     return (p / "index.faiss").exists() and (p / "index.pkl").exists()
 
 
-def get_retriever(vector_dir: str, embed_model: str):
-    vs = load_vectorstore(vector_dir, embed_model)
-    return vs.as_retriever(search_kwargs={"k": 5})
+def index_version(vector_dir: str | Path) -> str:
+    """Name of the live index: the published version, else a fingerprint of the files on disk."""
+    version = current_version(vector_dir)
+    if version:
+        return version
+    p = Path(vector_dir)
+    parts: List[str] = []
+    for name in ("index.faiss", "index.pkl"):
+        f = p / name
+        if f.exists():
+            st = f.stat()
+            parts.append(f"{st.st_mtime_ns}-{st.st_size}")
+    return ":".join(parts) or "missing"
+
+
+def _index_dir_for(vector_dir: str | Path, version: str) -> Path:
+    d = version_dir(vector_dir, version)
+    return d if d.is_dir() else Path(vector_dir)
+
+
+class HotSwapVectorStore:
+    """Live FAISS store that swaps in newly published index versions without downtime.
+
+    Every ``check_interval`` seconds a caller's ``snapshot()`` looks at the index
+    version on disk; if it changed, the new store is loaded on a background thread
+    and swapped in once ready. Requests keep the (version, store) pair they were
+    handed, so in-flight work finishes against the old index. ``check_interval <= 0``
+    disables reloading.
+    """
+
+    def __init__(self, vector_dir: str, embed_model: str, check_interval: float = 30.0):
+        self.vector_dir = vector_dir
+        self.embed_model = embed_model
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._loading = False
+        self._last_check = time.monotonic()
+        self.version = index_version(vector_dir)
+        self.vectorstore = load_vectorstore(str(_index_dir_for(vector_dir, self.version)), embed_model)
+
+    def snapshot(self) -> Tuple[str, FAISS]:
+        self._maybe_reload()
+        with self._lock:
+            return self.version, self.vectorstore
+
+    def _maybe_reload(self) -> None:
+        if self.check_interval <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._loading or now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+        latest = index_version(self.vector_dir)
+        with self._lock:
+            if latest == self.version or self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._load, args=(latest,), daemon=True).start()
+
+    def _load(self, version: str) -> None:
+        try:
+            vs = load_vectorstore(str(_index_dir_for(self.vector_dir, version)), self.embed_model,
+                                  embeddings=self.vectorstore.embeddings)
+            with self._lock:
+                self.version, self.vectorstore = version, vs
+            logger.info("Swapped in FAISS index version %s", version)
+        except Exception as e:
+            # Keep serving the current index; the next check will retry.
+            logger.warning("Could not load FAISS index version %s: %s", version, e)
+        finally:
+            with self._lock:
+                self._loading = False
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping that counts hits and misses."""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = max(1, int(maxsize))
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = max(1, int(maxsize))
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+
+class RetrievalCache:
+    """Query-vector, retrieval-result and contextualize caches.
+
+    - ``embeddings``: (embedding model, normalized question) -> query vector
+    - ``results``: (normalized standalone question, k, index version) -> documents
+    - ``contextualize``: hash of (chat history, question) -> standalone question
+
+    Query vectors only depend on the embedding model, so they survive re-indexing and
+    are cleared only when the model changes. Results carry the index version in their
+    key, so entries for a replaced index are never served and simply age out.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.embeddings = LRUCache(maxsize)
+        self.results = LRUCache(maxsize)
+        self.contextualize = LRUCache(maxsize)
+        self.embed_model: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def sync_embed_model(self, embed_model: str) -> None:
+        """Drop cached query vectors if the embedding model changed."""
+        with self._lock:
+            if embed_model == self.embed_model:
+                return
+            self.embeddings.clear()
+            self.embed_model = embed_model
+
+    def resize(self, maxsize: int) -> None:
+        for c in (self.embeddings, self.results, self.contextualize):
+            c.resize(maxsize)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "embed_model": self.embed_model,
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+            "contextualize": self.contextualize.stats(),
+        }
+
+
+_retrieval_cache: Optional[RetrievalCache] = None
+_retrieval_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache(maxsize: int = 512) -> RetrievalCache:
+    """Return the process-wide retrieval cache, creating it on first use.
+
+    A later call with a different ``maxsize`` resizes the existing caches.
+    """
+    global _retrieval_cache
+    with _retrieval_cache_lock:
+        if _retrieval_cache is None:
+            _retrieval_cache = RetrievalCache(maxsize)
+        elif _retrieval_cache.results.maxsize != max(1, int(maxsize)):
+            logger.info("Resizing retrieval caches to %s entries", maxsize)
+            _retrieval_cache.resize(maxsize)
+        return _retrieval_cache
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit rates and sizes for the retrieval caches (empty if none created yet)."""
+    return _retrieval_cache.stats() if _retrieval_cache is not None else {}
+
+
+def normalize_question(text: str) -> str:
+    # Whitespace only: casing can matter to cased embedding models.
+    return " ".join(str(text).split())
+
+
+def _history_key(chat_history: Any, question: str) -> str:
+    history = chat_history if isinstance(chat_history, str) else repr(chat_history)
+    payload = f"{history}\x00{normalize_question(question)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def create_cached_history_aware_retriever(llm, store: HotSwapVectorStore, prompt,
+                                          cache: RetrievalCache, k: int = 5):
+    """History-aware retriever with memoized contextualize, query-vector and search steps.
+
+    Behaves like ``create_history_aware_retriever``: input is ``{'input', 'chat_history'}``
+    and the output is a list of Documents. Without chat history the question is used as-is.
+    The index snapshot is taken once per call, so a hot swap never mixes versions.
+    """
+    rephrase = prompt | llm | StrOutputParser()
+    cache.sync_embed_model(store.embed_model)
+
+    def _contextualize(x: Dict[str, Any], config=None) -> Dict[str, Any]:
+        version, vectorstore = store.snapshot()
+        question = x["input"]
+        history = x.get("chat_history")
+        standalone = question
+        if history:
+            key = _history_key(history, question)
+            standalone = cache.contextualize.get(key)
+            if standalone is None:
+                standalone = rephrase.invoke(x, config)
+                cache.contextualize.put(key, standalone)
+        return {"question": standalone, "version": version, "vectorstore": vectorstore}
+
+    def _retrieve(x: Dict[str, Any]) -> List[Document]:
+        question, version, vectorstore = x["question"], x["version"], x["vectorstore"]
+        norm = normalize_question(question)
+        result_key = (norm, k, version)
+        docs = cache.results.get(result_key)
+        if docs is None:
+            vector_key = (store.embed_model, norm)
+            vector = cache.embeddings.get(vector_key)
+            if vector is None:
+                vector = vectorstore.embeddings.embed_query(norm)
+                cache.embeddings.put(vector_key, vector)
+            hits = vectorstore.similarity_search_with_score_by_vector(vector, k=k)
+            # The key includes the index version, so caching the documents is safe
+            docs = tuple(doc for doc, _ in hits)
+            cache.results.put(result_key, docs)
+        return list(docs)
+
+    return RunnableLambda(_contextualize) | RunnableLambda(_retrieve)
 
 
 def format_docs(docs: List[Document]) -> str:
@@ -74,23 +360,37 @@ def build_rag_chain():
     else:
         llm = llms[0]
 
-    base_retriever = get_retriever(cfg['VECTOR_DIR'], cfg['EMBED_MODEL'])
+    store = HotSwapVectorStore(cfg['VECTOR_DIR'], cfg['EMBED_MODEL'],
+                               check_interval=cfg['INDEX_CHECK_INTERVAL'])
+    cache = get_retrieval_cache(cfg['RAG_CACHE_SIZE'])
 
-    # History-aware retriever: turn follow-ups into standalone questions
+    # History-aware retriever: turn follow-ups into standalone questions.
+    # Rewrites, query vectors and search results are cached per index version, and
+    # newly published index versions are swapped in without rebuilding the chain.
     contextualize_prompt = PromptTemplate.from_template(CONTEXTUALIZE_QUESTION_PROMPT)
-    hist_aware_retriever = create_history_aware_retriever(
+    hist_aware_retriever = create_cached_history_aware_retriever(
         llm=llm,
-        retriever=base_retriever,
+        store=store,
         prompt=contextualize_prompt,
+        cache=cache,
+        k=5,
     )
 
     prompt = PromptTemplate.from_template(RAG_PROMPT)
 
-    # The retriever expects a dict with keys {'input','chat_history'}
-    to_retriever = RunnableLambda(lambda x: {"input": x.get("question", x), "chat_history": x.get("chat_history", "")})
+    # Callers may pass already-retrieved 'docs' so citations and the answer come from
+    # the same index snapshot; otherwise retrieve here. The retriever expects a dict
+    # with keys {'input','chat_history'}.
+    def _context_docs(x, config=None) -> List[Document]:
+        if isinstance(x, dict) and x.get("docs") is not None:
+            return x["docs"]
+        return hist_aware_retriever.invoke(
+            {"input": x.get("question", x), "chat_history": x.get("chat_history", "")}, config
+        )
+
     rag_chain = (
         {
-            "context": to_retriever | hist_aware_retriever | format_docs,
+            "context": RunnableLambda(_context_docs) | format_docs,
             "question": RunnableLambda(lambda x: x.get("question", x)),
             "chat_history": RunnableLambda(lambda x: x.get("chat_history", "")),
             "profile": RunnableLambda(lambda x: x.get("profile", {})),
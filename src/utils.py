@@ -40,6 +40,14 @@ def get_config():
         'CHUNK_SIZE': int(os.getenv('CHUNK_SIZE', '900')),
         'CHUNK_OVERLAP': int(os.getenv('CHUNK_OVERLAP', '120')),
         'TEMPERATURE': float(os.getenv('TEMPERATURE', '0.2')),
+        # Max entries per retrieval cache (query vectors, results, rewrites)
+        'RAG_CACHE_SIZE': int(os.getenv('RAG_CACHE_SIZE', '512')),
+        # Seconds between checks for a newly published index version (0 disables)
+        'INDEX_CHECK_INTERVAL': float(os.getenv('INDEX_CHECK_INTERVAL', '30')),
+        # Number of built index versions to keep on disk (including the live one)
+        'INDEX_KEEP_VERSIONS': int(os.getenv('INDEX_KEEP_VERSIONS', '3')),
+        # Reject a rebuild whose chunk count is more than this fraction below the live one
+        'INDEX_MAX_SHRINK': float(os.getenv('INDEX_MAX_SHRINK', '0.5')),
         # Comma-separated fallback list for Groq models
         'GROQ_FALLBACKS': [m.strip() for m in os.getenv(
             'GROQ_FALLBACKS', 'llama3-70b-8192,mixtral-8x7b-32768,llama-3.1-8b-instant'